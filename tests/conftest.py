@@ -0,0 +1,11 @@
+"""Pytest configuration.
+
+The app modules import each other as top-level modules, in the same way as
+when the app is run with `streamlit run ui/main.py`, so the `ui` directory
+needs to be on `sys.path`.
+"""
+from pathlib import Path
+import sys
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'ui'))
@@ -0,0 +1,52 @@
+"""Tests for elements and utilities in `common_elements`."""
+import pytest
+
+pytest.importorskip('streamlit')
+pytest.importorskip('iamcompact_nomenclature')
+pytest.importorskip('iamcompact_vetting')
+
+from common_elements import GetOnReadBytesIO  # noqa: E402
+
+
+DATA: bytes = b'abcdefghij'
+
+
+class _CountingOnRead:
+    """Callable for `on_read` that counts how many times it is called."""
+
+    def __init__(self) -> None:
+        self.num_calls: int = 0
+
+    def __call__(self) -> bytes:
+        self.num_calls += 1
+        return DATA
+
+
+@pytest.mark.parametrize('cache_data', [True, False])
+def test_chunked_read_reaches_eof(cache_data: bool) -> None:
+    on_read = _CountingOnRead()
+    buffer = GetOnReadBytesIO(on_read, cache_data=cache_data)
+    chunks: list[bytes] = []
+    while (chunk := buffer.read(3)):
+        chunks.append(chunk)
+    assert b''.join(chunks) == DATA
+    assert on_read.num_calls == 1
+
+
+def test_no_cache_refetches_from_start() -> None:
+    on_read = _CountingOnRead()
+    buffer = GetOnReadBytesIO(on_read, cache_data=False)
+    assert buffer.read() == DATA
+    assert buffer.read() == b''
+    buffer.seek(0)
+    assert buffer.read() == DATA
+    assert on_read.num_calls == 2
+
+
+def test_no_cache_keeps_data_while_buffer_is_exported() -> None:
+    on_read = _CountingOnRead()
+    buffer = GetOnReadBytesIO(on_read, cache_data=False)
+    view = buffer.getbuffer()
+    assert buffer.read() == DATA
+    assert on_read.num_calls == 1
+    view.release()
@@ -0,0 +1,30 @@
+"""Tests for parsing of uploaded files on the upload page."""
+import pytest
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('pyam')
+pytest.importorskip('streamlit')
+pytest.importorskip('iamcompact_nomenclature')
+
+from p.Upload_data import (  # noqa: E402
+    UploadFormatError,
+    parse_uploaded_file,
+)
+
+
+CSV_TEXT: str = (
+    'Model,Scenario,Region,Variable,Unit,2020,2030\n'
+    'model_a,scen_a,Köln,Temperature,°C,1.0,1.5\n'
+    'model_a,scen_a,World,Final Energy,EJ/yr,400.0,420.0\n'
+)
+
+
+def test_parse_utf8_csv() -> None:
+    idf = parse_uploaded_file(CSV_TEXT.encode('utf-8'), file_type='text/csv')
+    assert sorted(idf.region) == ['Köln', 'World']
+    assert sorted(idf.unit) == ['EJ/yr', '°C']
+
+
+def test_parse_cp1252_csv_raises() -> None:
+    with pytest.raises(UploadFormatError, match='UTF-8'):
+        parse_uploaded_file(CSV_TEXT.encode('cp1252'), file_type='text/csv')
@@ -7,8 +7,8 @@ from collections.abc import (
     MutableMapping,
     Sequence,
 )
+import functools
 import io
-from pathlib import Path
 import typing as tp
 import warnings
 
@@ -24,6 +24,7 @@ from nomenclature import (
     DataStructureDefinition,
 )
 import pandas as pd
+from pandas.api.types import is_scalar
 from pandas.io.formats.style import Styler as PandasStyler
 import streamlit as st
 from streamlit.delta_generator import DeltaGenerator
@@ -89,6 +90,9 @@ def common_instructions() -> None:
     code where any calls to `st.write`, `st.info` or similar methods are
     appropriate.
     """
+    if st.session_state.get(SSKey.DISMISSED_WARNING, False):
+        return
+
     @st.dialog(title='NB!', width='large')
     def _dismissable_warnings():
         st.info(
@@ -100,34 +104,40 @@ def common_instructions() -> None:
             'Do not show again until next run',
             value=True,
         )
-    if not st.session_state.get(SSKey.DISMISSED_WARNING, False):
-        _dismissable_warnings()
+    _dismissable_warnings()
 ###END def common_instructions
 
 
+_ALL_PASSED_MESSAGES: tp.Final[dict[bool, str]] = {
+    True: '**Status: :green[All checks passed]**',
+    False: '**Status: :red[Some checks failed]**',
+}
+_ALL_INCLUDED_MESSAGES: tp.Final[dict[bool, str]] = {
+    True: '**Coverage: :green[All models/scenarios assessed for all '
+        'checks]**',
+    False: '**Coverage: :red[Some models/scenarios not assessed for some '
+        'or all checks]**',
+}
+_PASSED_STATUS_MESSAGES: tp.Final[dict[tuple[bool, bool], str]] = {
+    (_all_passed, _all_included): '\n\n'.join(
+        [_ALL_PASSED_MESSAGES[_all_passed],
+         _ALL_INCLUDED_MESSAGES[_all_included]]
+    )
+    for _all_passed in (True, False)
+    for _all_included in (True, False)
+}
+"""Messages returned by `make_passed_status_message`, keyed by
+`(all_passed, all_included)`.
+"""
+
+
 def make_passed_status_message(all_passed: bool, all_included: bool) -> str:
-    """Make an HTML message to display whether all checks have passed.
+    """Make a markdown message to display whether all checks have passed.
 
     Also makes a message to display whether all models/scenarios have been
     assessed for all checks.
     """
-    all_passed_message: str
-    all_included_message: str
-    if all_passed:
-        all_passed_message = '<p style="font-weight: bold">Status: ' \
-            '<span style="color: green">All checks passed</span></p>'
-    else:
-        all_passed_message = '<p style="font-weight: bold">Status: ' \
-            '<span style="color: red">Some checks failed</span></p>'
-    if all_included:
-        all_included_message = '<p style="font-weight: bold">Coverage: ' \
-            '<span style="color: green">All models/scenarios assessed for ' \
-            'all checks</span></p>'
-    else:
-        all_included_message = '<p style="font-weight: bold">Coverage: ' \
-            '<span style="color: red">Some models/scenarios not assessed ' \
-            'for some or all checks</span></p>'
-    return '\n'.join([all_passed_message, all_included_message])
+    return _PASSED_STATUS_MESSAGES[(bool(all_passed), bool(all_included))]
 ###END def make_status_message
 
 
@@ -137,7 +147,7 @@ def download_excel_targetrange_output_button(
         | dict[str, pd.DataFrame|PandasStyler],
     outputter: CriterionTargetRangeOutput | MultiCriterionTargetRangeOutput \
         | TimeseriesRefComparisonAndTargetOutput,
-    download_path_key: SSKey,
+    download_data_key: SSKey,
     download_file_name: str = 'download.xlsx',
     use_prepare_button: bool = True,
     download_button_text: str = 'Download xlsx',
@@ -156,8 +166,9 @@ def download_excel_targetrange_output_button(
         The outputter object to be used to write the data. Should be the same
         object that was used to generate `output_data` using its
         `prepare_output` or `prepare_styled_output` method.
-    download_path_key : SSKey
-        The session state key to use to store the path of the downloaded file.
+    download_data_key : SSKey
+        The session state key to use to store the bytes of the prepared Excel
+        file.
     download_file_name : str, optional
         The name of the file to be downloaded. Optional, 'download.xlsx' by
         default.
@@ -165,9 +176,9 @@ def download_excel_targetrange_output_button(
         Whether to present the user with a button that needs to be clicked
         before the output data is prepared. If True, rather than presenting the
         user directly with a download button, there will first be a button that
-        the user must press, which will write the Excel data to a temporary
-        file, and then replace the prepare button with a download button. This
-        avoids having to spend time and disk space to write a file that might
+        the user must press, which will write the Excel data to an in-memory
+        buffer, and then replace the prepare button with a download button.
+        This avoids having to spend time and memory to write a file that might
         not get downloaded at all. If False, the function will prepare an Excel
         file for download immediately, and present a download button directly.
         Optional, True by default.
@@ -189,27 +200,27 @@ def download_excel_targetrange_output_button(
     """
     button_element = st.empty()
     text_element = st.empty()
-    download_file_path: Path|None \
-        = st.session_state.get(download_path_key, None)
-    if download_file_path is None or not download_file_path.exists():
+    download_data: bytes|None = st.session_state.get(download_data_key, None)
+    if download_data is None:
         if use_prepare_button:
             prepare_button = button_element.button(prepare_button_text)
             if prepare_download_text is not None:
                 text_element.markdown(prepare_download_text)
             if not prepare_button:
                 return
-        download_file_path = write_excel_targetrange_output(
+        _buffer: io.BytesIO = write_excel_targetrange_output(
             output_data=output_data,
             outputter=outputter,
-            file=None,
-        )
-        st.session_state[download_path_key] = download_file_path
-    with open (download_file_path, 'rb') as _f:
-        download_button = button_element.download_button(
-            label=download_button_text,
-            data=_f,
-            file_name=download_file_name,
+            file=io.BytesIO(),
+            close_after_write=True,
         )
+        download_data = _buffer.getvalue()
+        st.session_state[download_data_key] = download_data
+    download_button = button_element.download_button(
+        label=download_button_text,
+        data=download_data,
+        file_name=download_file_name,
+    )
     if download_data_text is not None:
         text_element.markdown(download_data_text)
     else:
@@ -246,9 +257,13 @@ def get_validation_dsd(
         already been loaded. If False and the DataStructureDefinition object
         has not already been loaded, the function will return None.
     force_load : bool, optional
-        Whether to force loading of the DataStructureDefinition object, i.e.,
-        don't obtain it from the session state even if it is available.
-        Optional, by default False.
+        Whether to force reloading of the DataStructureDefinition object from
+        its source, i.e., don't obtain it from the session state or the shared
+        cache even if it is available. The reloaded object replaces the one in
+        the shared cache, so other sessions get it the next time they load the
+        DataStructureDefinition (sessions that have already loaded it keep
+        their current object). Should only be used for explicit user requests
+        to reload the definitions. Optional, by default False.
     show_spinner : bool, optional
         Whether to show a spinner while loading. Optional, by default True.
 
@@ -258,20 +273,44 @@ def get_validation_dsd(
         The DataStructureDefinition object for the validation checks if already
         loaded into session state or if `allow_load` is True. None if it has
         not been loaded and `allow_load` is False.
+
+    Notes
+    -----
+    The DataStructureDefinition object is loaded through
+    `_load_validation_dsd`, which is cached with `st.cache_resource`, so that
+    it is only loaded once per server process and shared between sessions
+    (until a reload is forced with `force_load`). The object is not copied, and
+    must not be modified.
     """
     dsd: DataStructureDefinition|None = st.session_state.get(
         SSKey.VALIDATION_DSD, None)
     if (dsd is None and allow_load) or force_load:
+        if force_load:
+            _load_validation_dsd.clear()
         if show_spinner:
             with st.spinner('Loading datastructure definition...'):
-                dsd = icnom.get_dsd(force_reload=force_load)
+                dsd = _load_validation_dsd(_force_reload=force_load)
         else:
-            dsd = icnom.get_dsd(force_reload=force_load)
+            dsd = _load_validation_dsd(_force_reload=force_load)
         st.session_state[SSKey.VALIDATION_DSD] = dsd
     return dsd
 ###END def get_validation_dsd
 
 
+@st.cache_resource(show_spinner=False)
+def _load_validation_dsd(
+        _force_reload: bool = False,
+) -> DataStructureDefinition:
+    """Load the DataStructureDefinition object, cached across sessions.
+
+    `_force_reload` is passed on to `iamcompact_nomenclature.get_dsd`, to
+    bypass its own in-memory cache. The leading underscore excludes it from
+    the `st.cache_resource` key, so there is only ever one cache entry.
+    """
+    return icnom.get_dsd(force_reload=_force_reload)
+###END def _load_validation_dsd
+
+
 def make_attribute_df(
         codelist: CodeList,
         attr_names: tp.Optional[Iterable[str]] = None,
@@ -307,22 +346,72 @@ def make_attribute_df(
         attr_names = ['name', 'description']
     if column_names is None:
         column_names = dict(zip(attr_names, attr_names))
-    return_df: pd.DataFrame = pd.DataFrame(
-        data=[
-            [getattr(_code, _attr_name) for _attr_name in attr_names]
-            if use_filler==False else
-            [getattr(_code, attrname, use_filler) for attrname in attr_names]
-            for _code in codelist.values()
-        ],
-        columns=list(column_names.values()),
-        dtype=str,
-    )
-    if use_filler is not False:
-        return_df = return_df.fillna(use_filler)
-    return return_df
+    codes: list = list(codelist.values())
+    columns: dict[str, list]
+    if use_filler is False:
+        columns = {
+            column_names.get(_attr_name, _attr_name):
+                [getattr(_code, _attr_name) for _code in codes]
+            for _attr_name in attr_names
+        }
+    else:
+        # Substitute the filler for missing values (None or NaN, as `fillna`
+        # would) here rather than with `fillna` afterwards, to avoid copying
+        # the whole DataFrame. Non-scalar values (e.g., lists) are never
+        # missing.
+        columns = {
+            column_names.get(_attr_name, _attr_name): [
+                use_filler if is_scalar(_value) and pd.isna(_value) else _value
+                for _value in (
+                    getattr(_code, _attr_name, None) for _code in codes
+                )
+            ]
+            for _attr_name in attr_names
+        }
+    return pd.DataFrame(data=columns, dtype=str)
 ###END def make_attribute_df
 
 
+def get_attribute_df(
+        codelist: CodeList,
+        attr_names: tp.Optional[Sequence[str]] = None,
+        column_names: tp.Optional[Mapping[str, str]] = None,
+        use_filler: bool|tp.Any = False,
+) -> pd.DataFrame:
+    """Get a DataFrame with attributes of a CodeList, cached in session state.
+
+    Returns the output of `make_attribute_df` for the given arguments. The
+    DataFrame is stored in `st.session_state[SSKey.VALIDATION_ATTRIBUTE_DFS]`
+    together with the CodeList object it was made from, and is reused on later
+    calls for the same arguments as long as `codelist` is the same object. The
+    returned DataFrame is shared between calls, and should not be modified in
+    place.
+
+    Parameters are the same as for `make_attribute_df`, except that
+    `use_filler` must be hashable.
+    """
+    cache: dict[Hashable, tuple[CodeList, pd.DataFrame]] = \
+        st.session_state.setdefault(SSKey.VALIDATION_ATTRIBUTE_DFS, {})
+    cache_key: Hashable = (
+        codelist.name,
+        None if attr_names is None else tuple(attr_names),
+        None if column_names is None else tuple(column_names.items()),
+        use_filler,
+    )
+    cached: tp.Optional[tuple[CodeList, pd.DataFrame]] = cache.get(cache_key)
+    if cached is not None and cached[0] is codelist:
+        return cached[1]
+    attribute_df: pd.DataFrame = make_attribute_df(
+        codelist,
+        attr_names=attr_names,
+        column_names=column_names,
+        use_filler=use_filler,
+    )
+    cache[cache_key] = (codelist, attribute_df)
+    return attribute_df
+###END def get_attribute_df
+
+
 class GetOnReadBytesIO(io.BytesIO):
     """A BytesIO object that fetches data from a callable on first read.
 
@@ -338,12 +427,14 @@ class GetOnReadBytesIO(io.BytesIO):
         called on the first call to any of the following `BytesIO` methods:
         `getvalue()`, `getbuffer()`, `read()`, `read1()`, `readinto()`,
         `readinto1()`, `readline()`, and `readlines()`.
-    initial_bytes : bytes, optional
-        The initial bytes to store in the BytesIO object. Optional, by default
-        `b''`.
     cache_data : bool, optional
-        Whether to cache the data returned by `on_read`. Optional, by default
-        `True`.
+        Whether to cache the data returned by `on_read`. If `False`, `on_read`
+        is called again whenever reading starts over from the beginning of the
+        stream (i.e., when one of the read methods above is called at position
+        0 after data has already been fetched), unless a memoryview returned by
+        `getbuffer()` is still alive, in which case the current data is kept.
+        Reads that continue from a later position (e.g., reading in chunks) use
+        the data that has already been fetched. Optional, by default `True`.
 
     Attributes
     ----------
@@ -364,21 +455,40 @@ class GetOnReadBytesIO(io.BytesIO):
             self,
             on_read: tp.Callable[[], bytes],
             *,
-            initial_bytes: bytes = b'',
             cache_data: bool = True,
     ) -> None:
-        super().__init__(initial_bytes)
+        super().__init__()
         self.on_read: tp.Callable[[], bytes] = on_read
         self.is_cached: bool = False
         self.cache_data: bool = cache_data
+        self._has_data: bool = False
     ###END def GetOnReadBytesIO.__init__
 
     def _get_data(self) -> None:
-        """Reads data from `on_read` or from cache."""
+        """Reads data from `on_read` or from cache.
+
+        The buffer is re-initialized with the bytes object returned by
+        `on_read` rather than written to. `io.BytesIO` then shares the bytes
+        object instead of copying it into a new internal buffer, so the data
+        is only held in memory once (until it is modified).
+
+        Re-initializing also resets the position to 0, so it is only done when
+        no data has been fetched yet, or (if `cache_data` is `False`) when the
+        position already is 0. Existing data is dropped with `truncate` first.
+        That raises `BufferError` if a `getbuffer()` view is still alive, in
+        which case the current data is kept and `on_read` is not called.
+        """
         if self.is_cached:
             return
-        self.write(self.on_read())
-        self.seek(0)
+        if self._has_data:
+            if self.tell() > 0:
+                return
+            try:
+                self.truncate(0)
+            except BufferError:
+                return
+        io.BytesIO.__init__(self, self.on_read())
+        self._has_data = True
         if self.cache_data:
             self.is_cached = True
     ###END def _get_data
@@ -388,6 +498,7 @@ class GetOnReadBytesIO(io.BytesIO):
         self.seek(0)
         self.truncate(0)
         self.is_cached = False
+        self._has_data = False
     ###END def clear_cache
 
     def read(self, size: int = -1) -> bytes:
@@ -499,6 +610,9 @@ class CachingFunction[ReturnTypeVar]:
         Whether a return value is cached. If True, a return value from the
         cached function has been cached, and will be returned whenever the
         instance is called.
+    cache_type : str
+        'external_dict' if the value is cached in `cache_dict`, 'internal'
+        otherwise.
 
     Methods
     -------
@@ -517,23 +631,42 @@ class CachingFunction[ReturnTypeVar]:
     ) -> None:
         self._function: tp.Callable[[], ReturnTypeVar] = function
         self._no_cached_value: tp.Final[_NoCachedValue] = _NoCachedValue(self)
-        if cache_dict is None:
-            self._cache_value: ReturnTypeVar|_NoCachedValue = \
-                self._no_cached_value
-        else:
+        self._use_external: tp.Final[bool] = cache_dict is not None
+        # Bind the getter and setter for the cache once, so that the methods
+        # that read or write the cache don't need to check the cache type on
+        # every call.
+        self._cache_getter: tp.Callable[[], ReturnTypeVar|_NoCachedValue]
+        self._cache_setter: tp.Callable[[ReturnTypeVar|_NoCachedValue], None]
+        if self._use_external:
             self._cache_dict: MutableMapping = cache_dict
             self._cache_key: Hashable = cache_key
             if self._cache_key not in self._cache_dict:
                 self._cache_dict[cache_key] = self._no_cached_value
-        self.cache_type: tp.Final[tp.Literal['internal', 'external_dict']] = \
-            'internal' if hasattr(self, '_cache_value') else 'external_dict'
-        if self.cache_type == 'external_dict' and not hasattr(self, '_cache_dict'):
-            raise RuntimeError(
-                '`self.cache_type == "external_dict"` but `self._cache_dict` '
-                'is not set. This should not be possible.'
-            )
+            self._cache_getter = functools.partial(
+                self._cache_dict.__getitem__, self._cache_key)
+            self._cache_setter = functools.partial(
+                self._cache_dict.__setitem__, self._cache_key)
+        else:
+            self._cache_value: ReturnTypeVar|_NoCachedValue = \
+                self._no_cached_value
+            self._cache_getter = self._get_internal_value
+            self._cache_setter = self._set_internal_value
     ###END def CachingFunction.__init__
 
+    @property
+    def cache_type(self) -> tp.Literal['internal', 'external_dict']:
+        """Whether the value is cached internally or in an external dict."""
+        return 'external_dict' if self._use_external else 'internal'
+    ###END def CachingFunction.cache_type
+
+    def _get_internal_value(self) -> ReturnTypeVar|_NoCachedValue:
+        return self._cache_value
+    ###END def CachingFunction._get_internal_value
+
+    def _set_internal_value(self, value: ReturnTypeVar|_NoCachedValue) -> None:
+        self._cache_value = value
+    ###END def CachingFunction._set_internal_value
+
     def _is_not_cached_value(self, value: ReturnTypeVar|_NoCachedValue) -> bool:
         """Whether a value indicates that no value has been cached.
 
@@ -565,14 +698,7 @@ class CachingFunction[ReturnTypeVar]:
 
     def _get_cached_value(self) -> ReturnTypeVar|_NoCachedValue:
         """Get the cached value, or `NoCachedValue` if not cached."""
-        if self.cache_type == 'internal':
-            return self._cache_value
-        elif self.cache_type == 'external_dict':
-            return self._cache_dict[self._cache_key]
-        else:
-            raise RuntimeError(
-                f'Unknown `self.cache_type`: {self.cache_type}'
-            )
+        return self._cache_getter()
     ###END def CachingFunction._get_cached_value
 
     def _require_cached_value(self) -> ReturnTypeVar:
@@ -589,14 +715,7 @@ class CachingFunction[ReturnTypeVar]:
 
     def _set_cached_value(self, value: ReturnTypeVar) -> None:
         """Set the cached value."""
-        if self.cache_type == 'internal':
-            self._cache_value = value
-        elif self.cache_type == 'external_dict':
-            self._cache_dict[self._cache_key] = value
-        else:
-            raise RuntimeError(
-                f'Unknown `self.cache_type`: {self.cache_type}'
-            )
+        self._cache_setter(value)
     ###END def CachingFunction._set_cached_value
 
     @property
@@ -607,10 +726,11 @@ class CachingFunction[ReturnTypeVar]:
 
     def __call__(self) -> ReturnTypeVar:
         """Get the cached value, or call the function."""
-        if self.has_cached_value:
-            return self._require_cached_value()
+        cached_value: ReturnTypeVar|_NoCachedValue = self._cache_getter()
+        if not self._is_not_cached_value(cached_value):
+            return tp.cast(ReturnTypeVar, cached_value)
         func_value: ReturnTypeVar = self._function()
-        self._set_cached_value(func_value)
+        self._cache_setter(func_value)
         return func_value
     ###END def CachingFunction.__call__
 
@@ -618,20 +738,76 @@ class CachingFunction[ReturnTypeVar]:
         """Clears the cache. The next time the instance is called, the cached
         function will be called again, and the resulting return value will be
         stored in the cache."""
-        if self.cache_type == 'internal':
-            self._cache_value = self._no_cached_value
-        elif self.cache_type == 'external_dict':
-            self._cache_dict[self._cache_key] = self._no_cached_value
-        else:
-            raise RuntimeError(
-                f'Unknown `self.cache_type`: {self.cache_type}'
-            )
+        self._cache_setter(self._no_cached_value)
     ###END def CachingFunction.clear_cache
 
 ###END class CachingFunction
 
 
 
+_IGNORED_PREPARE_BUTTON_KWARGS: tp.Final[dict[str, str]] = {
+    'label': 'The `label` item in `prepare_button_kwargs` is ignored, use the '
+        '`prepare_button_label` parameter instead.',
+}
+"""Items in `prepare_button_kwargs` that `deferred_download_button` ignores,
+mapped to the warning message to emit for each of them.
+"""
+_IGNORED_DOWNLOAD_BUTTON_KWARGS: tp.Final[dict[str, str]] = {
+    'label': 'The `label` item in `download_button_kwargs` is ignored, use the '
+        '`download_button_label` parameter instead.',
+    'file_name': 'The `file_name` item in `download_button_kwargs` is ignored, '
+        'use the `download_file_name` parameter instead.',
+    'data': 'The `data` item in `download_button_kwargs` is ignored. the '
+        'value returned by `data_func` will be used instead.',
+}
+"""Items in `download_button_kwargs` that `deferred_download_button` ignores,
+mapped to the warning message to emit for each of them.
+"""
+
+
+def _drop_ignored_kwargs(
+        kwargs: tp.Optional[dict],
+        ignored: Mapping[str, str],
+) -> dict:
+    """Remove ignored items from a kwargs dict, with a warning for each.
+
+    Returns `kwargs` itself if it contains none of the keys in `ignored` (or an
+    empty dict if it is None), and otherwise a copy without those keys, so that
+    the caller's dict is never modified.
+    """
+    if kwargs is None:
+        return {}
+    if ignored.keys().isdisjoint(kwargs):
+        return kwargs
+    kwargs = dict(kwargs)
+    for _key, _message in ignored.items():
+        if _key in kwargs:
+            del kwargs[_key]
+            warnings.warn(_message)
+    return kwargs
+###END def _drop_ignored_kwargs
+
+
+def _write_notice(text: str, element: DeltaGenerator) -> None:
+    """Write a notice text to a Streamlit element."""
+    element.write(text)
+###END def _write_notice
+
+
+def _get_notice_renderer(
+        notice: tp.Optional[str|Callable[[DeltaGenerator], tp.Any]],
+) -> Callable[[DeltaGenerator], tp.Any]|None:
+    """Get a function that renders a notice given to `deferred_download_button`.
+
+    Returns None if `notice` is None, a function that writes `notice` to the
+    element it is given if `notice` is a str, and otherwise `notice` itself.
+    """
+    if notice is None or not isinstance(notice, str):
+        return notice
+    return functools.partial(_write_notice, notice)
+###END def _get_notice_renderer
+
+
 @st.fragment
 def deferred_download_button(
         data_func: tp.Callable[[], bytes] | CachingFunction[bytes],
@@ -741,34 +917,14 @@ def deferred_download_button(
         and the return value of the `st.download_button` function during the
         download step.
     """
-    if prepare_button_kwargs is None:
-        prepare_button_kwargs = {}
-    if 'label' in prepare_button_kwargs:
-        prepare_button_kwargs.pop('label')
-        warnings.warn(
-            'The `label` item in `prepare_button_kwargs` is ignored, use the '
-            '`prepare_button_label` parameter instead.'
-        )
-    if download_button_kwargs is None:
-        download_button_kwargs = {}
-    if 'label' in download_button_kwargs:
-        download_button_kwargs.pop('label')
-        warnings.warn(
-            'The `label` item in `download_button_kwargs` is ignored, use the '
-            '`download_button_label` parameter instead.'
-        )
-    if 'file_name' in download_button_kwargs:
-        download_button_kwargs.pop('file_name')
-        warnings.warn(
-            'The `file_name` item in `download_button_kwargs` is ignored, use '
-            'the `download_file_name` parameter instead.'
-        )
-    if 'data' in download_button_kwargs:
-        download_button_kwargs.pop('data')
-        warnings.warn(
-            'The `data` item in `download_button_kwargs` is ignored. the '
-            'value returned by `data_func` will be used instead.'
-        )
+    prepare_button_kwargs = _drop_ignored_kwargs(
+        prepare_button_kwargs,
+        _IGNORED_PREPARE_BUTTON_KWARGS,
+    )
+    download_button_kwargs = _drop_ignored_kwargs(
+        download_button_kwargs,
+        _IGNORED_DOWNLOAD_BUTTON_KWARGS,
+    )
     if not isinstance(data_func, CachingFunction):
         if not callable(data_func):
             raise TypeError(
@@ -785,20 +941,25 @@ def deferred_download_button(
             cache_dict=st.session_state,
             cache_key=data_cache_key
         )
+    render_prepare_notice: Callable[[DeltaGenerator], tp.Any]|None = \
+        _get_notice_renderer(prepare_notice)
+    render_download_notice: Callable[[DeltaGenerator], tp.Any]|None = \
+        _get_notice_renderer(download_notice)
     button_element = st.empty()
-    notice_element = st.empty()
+    # Only create a placeholder for notices if there are any to display
+    notice_element: DeltaGenerator|None = None
+    if render_prepare_notice is not None or render_download_notice is not None:
+        notice_element = st.empty()
     download_data: bytes  # Variable to hold the data to download
-    if not data_func.has_cached_value and not bypass_prepare:
+    has_cached_value: bool = data_func.has_cached_value
+    if not has_cached_value and not bypass_prepare:
         _prepare_button: bool = button_element.button(prepare_button_label,
                                                       **prepare_button_kwargs)
-        if prepare_notice is not None:
-            if isinstance(prepare_notice, str):
-                notice_element.write(prepare_notice)
-            else:
-                prepare_notice(notice_element)
+        if render_prepare_notice is not None:
+            render_prepare_notice(notice_element)
         if not _prepare_button:
             return False
-    if not data_func.has_cached_value:  # Show a spinner if data is not cached
+    if not has_cached_value:  # Show a spinner if data is not cached
         button_element.empty()
         with button_element:
             with st.spinner(spinner_text):
@@ -811,15 +972,25 @@ def deferred_download_button(
         file_name=download_file_name,
         **download_button_kwargs
     )
-    if download_notice is not None:
-        if isinstance(download_notice, str):
-            notice_element.write(download_notice)
-        else:
-            download_notice(notice_element)
+    if render_download_notice is not None:
+        render_download_notice(notice_element)
     return _download_button
 ###END def download_excel_output_button
 
 
+def _toggle_state_value(
+        state_key: str,
+        on_change: tp.Optional[Callable[..., None]],
+        args: tp.Optional[Sequence],
+        kwargs: tp.Optional[dict],
+) -> None:
+    """Toggle the state of a `stateful_checkbox` and call its `on_change`."""
+    st.session_state[state_key] = not st.session_state[state_key]
+    if on_change is not None:
+        on_change(*(args or ()), **(kwargs or {}))
+###END def _toggle_state_value
+
+
 @st.fragment
 def stateful_checkbox(
         label: str,
@@ -827,7 +998,7 @@ def stateful_checkbox(
         value: bool = False,
         key: tp.Optional[str] = None,
         help: tp.Optional[str] = None,
-        on_change: tp.Optional[Callable[[], None]] = None,
+        on_change: tp.Optional[Callable[..., None]] = None,
         args: tp.Optional[Sequence] = None,
         kwargs: tp.Optional[dict] = None,
         *,
@@ -870,30 +1041,28 @@ def stateful_checkbox(
     The function additionally accepts all other parameters accepted by
     `stremlit.checkbox`, with the same behavior.
     """
-    if not isinstance(value, bool):
+    if type(value) is not bool:
         raise TypeError(f'`value` must be a bool, not {type(value)}.')
-    use_value: bool|None = st.session_state.get(state_key, None)
-    if not (isinstance(use_value, bool) or use_value is None):
-        raise TypeError(
-            f'`streamlit.session_state["{state_key}"]` must be a bool.'
-        )
+    use_value: bool|None
+    try:
+        use_value = st.session_state[state_key]
+    except KeyError:
+        use_value = None
     if use_value is None:
         use_value = value
         st.session_state[state_key] = use_value
-
-    def _toggle_value() -> None:
-        if on_change is not None:
-            on_change()
-        st.session_state[state_key] = not st.session_state[state_key]
+    elif type(use_value) is not bool:
+        raise TypeError(
+            f'`streamlit.session_state["{state_key}"]` must be a bool.'
+        )
 
     st.checkbox(
         label,
         value=use_value,
         key=key,
         help=help,
-        on_change=_toggle_value,
-        args=args,
-        kwargs=kwargs,
+        on_change=_toggle_state_value,
+        args=(state_key, on_change, args, kwargs),
         disabled=disabled,
         label_visibility=label_visibility
     )
@@ -35,6 +35,12 @@ class SSKey(StrEnum):
 
     VALIDATION_DSD = 'validation_dsd'
     """Datastructure definition object to use for name validation."""
+    VALIDATION_ATTRIBUTE_DFS = 'validation_attribute_dfs'
+    """DataFrames with attributes of the codes in the validation CodeLists.
+
+    Dict of DataFrames created by `common_elements.get_attribute_df`, used to
+    avoid rebuilding the tables of valid names on every rerun.
+    """
     VALIDATION_INVALID_NAMES_DICT = 'validation_invalid_names_dict'
     """Dictionary with invalid names per dimension.
 
@@ -68,8 +74,8 @@ class SSKey(StrEnum):
     """
     AR6_CRITERIA_ALL_INCLUDED = 'ar6_criteria_all_included'
     """Whether all models/scenarios were assessed for all AR6 vetting checks."""
-    AR6_EXCEL_DOWNLOAD_PATH = 'ar6_excel_download_path'
-    """Path to the Excel file to be downloaded with AR6 vetting results. None
+    AR6_EXCEL_DOWNLOAD_BYTES = 'ar6_excel_download_bytes'
+    """Bytes of the Excel file to be downloaded with AR6 vetting results. None
     if no download file has been prepared yet.
     """
 
@@ -91,8 +97,8 @@ class SSKey(StrEnum):
     """Whether all models/scenarios were assessed for all GDP and population
     harmonization checks.
     """
-    GDP_POP_EXCEL_DOWNLOAD_PATH = 'gdp_pop_excel_download_path'
-    """Path to the Excel file to be downloaded with GDP and population
+    GDP_POP_EXCEL_DOWNLOAD_BYTES = 'gdp_pop_excel_download_bytes'
+    """Bytes of the Excel file to be downloaded with GDP and population
     harmonization results. None if no download file has been prepared yet.
     """
 
@@ -114,10 +120,11 @@ data_file_upload_clear_keys: tp.Final[tp.List[SSKey]] = [
     SSKey.AR6_CRITERIA_OUTPUT_DFS,
     SSKey.AR6_CRITERIA_ALL_PASSED,
     SSKey.AR6_CRITERIA_ALL_INCLUDED,
-    SSKey.AR6_EXCEL_DOWNLOAD_PATH,
+    SSKey.AR6_EXCEL_DOWNLOAD_BYTES,
     SSKey.GDP_POP_OUTPUT_DFS,
     SSKey.GDP_POP_ALL_PASSED,
     SSKey.GDP_POP_ALL_INCLUDED,
+    SSKey.GDP_POP_EXCEL_DOWNLOAD_BYTES,
 ]
 
 
@@ -127,9 +127,12 @@ def get_excel_writer(
     if isinstance(file, pd.ExcelWriter):
         pd_excel_writer: pd.ExcelWriter = file
     else:
+        # `in_memory` stops xlsxwriter from writing each worksheet to its own
+        # temporary file before assembling the workbook.
         pd_excel_writer = pd.ExcelWriter(
             file if file is not None else tmp_file_path,
-            engine='xlsxwriter'
+            engine='xlsxwriter',
+            engine_kwargs={'options': {'in_memory': True}},
         )
     writer: ExcelWriterTypeVar = excel_writer_class(
         pd_excel_writer,
@@ -69,7 +69,6 @@ def main():
             'for exclusion. The checks on future values (post-2020) were only '
             'a flag for possible issues.',
         ]),
-        unsafe_allow_html=True,
     )
 
     in_range_tab, values_tab, descriptions_tab = st.tabs(
@@ -124,7 +123,7 @@ def main():
     download_excel_targetrange_output_button(
         output_data=st.session_state[SSKey.AR6_CRITERIA_OUTPUT_DFS],
         outputter=outputter,
-        download_path_key=SSKey.AR6_EXCEL_DOWNLOAD_PATH,
+        download_data_key=SSKey.AR6_EXCEL_DOWNLOAD_BYTES,
         download_file_name=download_excel_file_name,
     )
     st.markdown(
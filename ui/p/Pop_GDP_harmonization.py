@@ -65,6 +65,7 @@ def main():
     else:
         if st.session_state.get(SSKey.GDP_POP_RUN_WITH_NON_REGIONMAPPED, False):
             st.session_state[SSKey.GDP_POP_OUTPUT_DFS] = None
+            st.session_state[SSKey.GDP_POP_EXCEL_DOWNLOAD_BYTES] = None
             st.session_state[SSKey.GDP_POP_RUN_WITH_NON_REGIONMAPPED] = False
 
     summary_df_key: str = get_summary_df_key()
@@ -100,7 +101,6 @@ def main():
                 all_included=st.session_state[SSKey.GDP_POP_ALL_INCLUDED],
             ),
         ]),
-        unsafe_allow_html=True,
     )
 
     st.markdown(
@@ -178,7 +178,7 @@ def main():
     download_excel_targetrange_output_button(
         output_data=st.session_state[SSKey.GDP_POP_OUTPUT_DFS],
         outputter=outputter,
-        download_path_key=SSKey.GDP_POP_EXCEL_DOWNLOAD_PATH,
+        download_data_key=SSKey.GDP_POP_EXCEL_DOWNLOAD_BYTES,
         download_file_name=download_excel_file_name,
     )
     st.markdown(
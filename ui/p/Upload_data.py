@@ -1,10 +1,10 @@
-import tempfile
+import io
 
 import pandas as pd
 import pyam
+from pyam.utils import read_pandas
 import streamlit as st
 from streamlit.elements.arrow import DataframeState
-from streamlit_extras.switch_page_button import switch_page
 
 from common_elements import (
     common_instructions,
@@ -25,13 +25,74 @@ from page_defs import (
 )
 
 
-# The option below should probably be removed, but just commenting out for now.
-# I don't think we want to do anything that triggers chained assignment
-# warnings.
-# pd.options.mode.chained_assignment = None  # default='warn'
-
 st.set_page_config(layout="wide")
 
+PARSED_FILE_CACHE_MAX_ENTRIES: int = 4
+"""Max number of parsed uploads to keep in the `parse_uploaded_file` cache.
+
+The cache is shared by all sessions, so it needs to be bounded to avoid
+keeping every file ever uploaded in memory on the server.
+"""
+
+TIMESERIES_TABLE_PAGE_SIZE: int = 1000
+"""Number of rows of the timeseries table to display at a time."""
+
+UPLOAD_INSTRUCTIONS_MD: str = mdblock(
+    """Upload a file with modelling results using the page to the right,
+    then go to subsequent pages to perform different vetting checks and view
+    or download the results.
+
+    The file to upload should be an Excel (.xlsx) or CSV file in IAMC \
+    format. CSV files must be UTF-8 encoded (in Excel, save as "CSV UTF-8").
+    Please observe the following formatting rules:
+
+    ### Column names
+    * The data sheet(s) must have the columns "Model", "Scenario", "Region",
+      "Variable", and "Unit" to the left.
+    * Subsequent columns should have years as headers (e.g., 2015, 2020,
+      etc.)
+    * If you require additional columns (like "Subannual"), please contact
+      the developers. Non-standard columns are likely to cause problems for
+      the current version of the vetting checks.
+
+    ### Excel file worksheets
+    If uploading an Excel file:
+    * All data (other than metadata) must be in one or more worksheets with
+      names that start with "data" or "Data".
+    * Metadata must be in a worksheet named "meta" (case-sensitive), though
+      the metadata is not used in the current vetting checks and therefore
+      is ignored for now.
+    * All other worksheets will be ignored.
+
+    ### Values
+    * All rows *must* have values for the index columns ("Model",
+      "Scenario", "Region", and "Variable"). "Unit" can be left blank for
+      dimensionless units with no scale factor (but is otherwise mandatory).
+    * No duplicate rows are allowed, i.e., all rows *must* have unique
+      for the index columns, even for rows in different Excel worksheets.
+    * Cells with missing data *must* be left blank. Do not use "NA", "-"
+      or other non-numeric values. A value of "0" will be interpreted as a
+      literal zero, and must not be used for missing values. Please check
+      that Excel has not filled in zeros in blank cells.
+    """
+)
+"""Markdown text with upload instructions for the sidebar."""
+
+IAMC_INDEX_COLUMNS: tuple[str, ...] = (
+    'model',
+    'scenario',
+    'region',
+    'variable',
+    'unit',
+)
+"""Required index columns of an uploaded file (lower-case)."""
+
+
+class UploadFormatError(ValueError):
+    """Raised when an uploaded file is not in the expected IAMC format."""
+    ...
+###END class UploadFormatError
+
 
 def main():
 
@@ -41,49 +102,12 @@ def main():
 
     st.sidebar.header("Instructions")
 
-    st.sidebar.markdown(mdblock(
-        """Upload a file with modelling results using the page to the right,
-        then go to subsequent pages to perform different vetting checks and view
-        or download the results.
-
-        The file to upload should be an Excel (.xlsx) or CSV file in IAMC \
-        format. Please observe the following formatting rules:
-
-        ### Column names
-        * The data sheet(s) must have the columns "Model", "Scenario", "Region",
-          "Variable", and "Unit" to the left.
-        * Subsequent columns should have years as headers (e.g., 2015, 2020,
-          etc.)
-        * If you require additional columns (like "Subannual"), please contact
-          the developers. Non-standard columns are likely to cause problems for
-          the current version of the vetting checks.
-
-        ### Excel file worksheets
-        If uploading an Excel file:
-        * All data (other than metadata) must be in one or more worksheets with
-          names that start with "data" or "Data".
-        * Metadata must be in a worksheet named "meta" (case-sensitive), though
-          the metadata is not used in the current vetting checks and therefore
-          is ignored for now.
-        * All other worksheets will be ignored.
-
-        ### Values
-        * All rows *must* have values for the index columns ("Model",
-          "Scenario", "Region", and "Variable"). "Unit" can be left blank for
-          dimensionless units with no scale factor (but is otherwise mandatory).
-        * No duplicate rows are allowed, i.e., all rows *must* have unique
-          for the index columns, even for rows in different Excel worksheets.
-        * Cells with missing data *must* be left blank. Do not use "NA", "-"
-          or other non-numeric values. A value of "0" will be interpreted as a
-          literal zero, and must not be used for missing values. Please check
-          that Excel has not filled in zeros in blank cells.
-        """
-    ))
+    st.sidebar.markdown(UPLOAD_INSTRUCTIONS_MD)
 
     def _clear_uploaded_iam_df():
-        for _key in set(data_file_upload_clear_keys) \
-                .intersection(set(st.session_state.keys())):
-            del st.session_state[_key]
+        for _key in data_file_upload_clear_keys:
+            if _key in st.session_state:
+                del st.session_state[_key]
     ###END def _clear_uploaded_iam_df
 
     uploaded_file = st.file_uploader(
@@ -94,39 +118,20 @@ def main():
         on_change=_clear_uploaded_iam_df
     )
 
-    # if uploaded_file is None:
-    #     _clear_uploaded_iam_df()
-
     if uploaded_file is not None \
               and st.session_state.get(SSKey.IAM_DF_UPLOADED, None) is None:
         with st.spinner('Parsing uploaded file...'):
-        # load data
-            if uploaded_file.type == 'text/csv':
-                with tempfile.NamedTemporaryFile(
-                        mode='w',
-                        encoding='utf-8',
-                        suffix='.csv',
-                        delete=True,
-                        delete_on_close=False,
-                ) as _file:
-                    _file.write(uploaded_file.getvalue().decode('utf-8'))
-                    raw_data: pyam.IamDataFrame = pyam.IamDataFrame(_file.name,
-                                                                    engine='c')
-            else:
-                with tempfile.NamedTemporaryFile(
-                        mode='wb',
-                        suffix='.xlsx',
-                        delete=True,
-                        delete_on_close=False,
-                ) as _file:
-                    _file.write(uploaded_file.getvalue())
-                    raw_data: pyam.IamDataFrame = pyam.IamDataFrame(_file.name,
-                                                                    engine='calamine')
-
-            st.session_state[SSKey.FILE_CURRENT_NAME] \
-                = st.session_state[SSKey.FILE_CURRENT_UPLOADED].name
-            st.session_state[SSKey.FILE_CURRENT_SIZE] = \
-                st.session_state[SSKey.FILE_CURRENT_UPLOADED].size
+            try:
+                raw_data: pyam.IamDataFrame = parse_uploaded_file(
+                    uploaded_file.getvalue(),
+                    file_type=uploaded_file.type,
+                )
+            except UploadFormatError as _err:
+                st.error(str(_err), icon='⛔')
+                st.stop()
+
+            st.session_state[SSKey.FILE_CURRENT_NAME] = uploaded_file.name
+            st.session_state[SSKey.FILE_CURRENT_SIZE] = uploaded_file.size
 
             # clean_results_dataset(raw_data)
             st.session_state[SSKey.IAM_DF_UPLOADED] = raw_data
@@ -164,10 +169,6 @@ def main():
                 proceed_info_text,
                 icon="ℹ️"
             )
-            # The call to `IamDataFrame.timeseries` here, as well as maybe
-            # `st.dataframe`, does take some time and may be computationally
-            # expensive. We should probably put them both inside a function
-            # that can be st.cached.
             df_state = make_timeseries_table(df)
         # validate_data_btn = st.button(continue_button_text)
         # if validate_data_btn:
@@ -176,19 +177,183 @@ def main():
 ###END def main
 
 
+@st.cache_data(show_spinner=False, max_entries=PARSED_FILE_CACHE_MAX_ENTRIES)
+def parse_uploaded_file(
+        file_bytes: bytes,
+        file_type: str,
+) -> pyam.IamDataFrame:
+    """Parse the contents of an uploaded file into an IamDataFrame.
+
+    The file is parsed directly from memory, without writing it to a
+    temporary file first. The result is cached by `st.cache_data`, which
+    hashes `file_bytes`, so uploading the same file again (e.g., after the
+    uploader has been cleared, or in another session) does not parse it a
+    second time.
+
+    Parameters
+    ----------
+    file_bytes : bytes
+        The raw contents of the uploaded file.
+    file_type : str
+        The MIME type of the uploaded file, as given by the `type` attribute of
+        the uploaded file object. `'text/csv'` is parsed as CSV, anything else
+        as an Excel file.
+
+    Returns
+    -------
+    pyam.IamDataFrame
+        The parsed data.
+
+    Raises
+    ------
+    UploadFormatError
+        If the file fails the checks in `check_csv_encoding` (for CSV files) or
+        `check_iamc_format`.
+    """
+    data: pd.DataFrame
+    if file_type == 'text/csv':
+        # The pyarrow engine parses in parallel over multiple threads. The
+        # columns are converted to ordinary NumPy-backed dtypes, since pyam
+        # does not work reliably with Arrow-backed dtypes. Unlike the C
+        # engine, it does not fail on invalid UTF-8, but silently returns
+        # bytes objects for the affected columns, so the encoding has to be
+        # checked first.
+        check_csv_encoding(file_bytes)
+        data = pd.read_csv(io.BytesIO(file_bytes), engine='pyarrow')
+    else:
+        # `read_pandas` only parses worksheets whose names start with "data" or
+        # "Data", and drops empty unnamed columns and empty rows, in the same
+        # way as when `pyam.IamDataFrame` reads an Excel file from disk.
+        data = read_pandas(io.BytesIO(file_bytes), engine='calamine')
+    check_iamc_format(data)
+    return pyam.IamDataFrame(data)
+###END def parse_uploaded_file
+
+
+def check_csv_encoding(file_bytes: bytes) -> None:
+    """Check that the contents of an uploaded CSV file are valid UTF-8.
+
+    Parameters
+    ----------
+    file_bytes : bytes
+        The raw contents of the uploaded file.
+
+    Raises
+    ------
+    UploadFormatError
+        If `file_bytes` cannot be decoded as UTF-8.
+    """
+    try:
+        file_bytes.decode('utf-8')
+    except UnicodeDecodeError as _err:
+        raise UploadFormatError(
+            'The uploaded CSV file is not UTF-8 encoded (invalid byte at '
+            f'position {_err.start}). Please save the file with UTF-8 '
+            'encoding (e.g., "CSV UTF-8" in Excel) and upload it again.'
+        ) from _err
+###END def check_csv_encoding
+
+
+def check_iamc_format(data: pd.DataFrame) -> None:
+    """Check that parsed upload data can be used to make an IamDataFrame.
+
+    Checks that the required index columns are present (case-insensitive), and
+    that there are no duplicate data points, i.e., rows with the same values in
+    the non-year columns that both have a value for the same year. Like in
+    `pyam.IamDataFrame`, such rows are allowed as long as the years they have
+    values for do not overlap. This only uses cheap pandas operations, so that
+    files with these errors are rejected with a readable message before the
+    much more expensive `pyam.IamDataFrame` constructor is run.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The parsed data, in IAMC wide format.
+
+    Raises
+    ------
+    UploadFormatError
+        If any of the required columns are missing, or if there are duplicate
+        rows.
+    """
+    lower_columns: set[str] = {str(_col).lower() for _col in data.columns}
+    missing_columns: list[str] = [
+        _col for _col in IAMC_INDEX_COLUMNS if _col not in lower_columns
+    ]
+    if len(missing_columns) > 0:
+        raise UploadFormatError(
+            'The uploaded file is missing the required column(s) '
+            + ', '.join(f'"{_col.capitalize()}"' for _col in missing_columns)
+            + '. Please see the formatting rules in the sidebar.'
+        )
+    non_year_columns: pd.Index = data.columns[
+        pd.to_numeric(data.columns.astype(str), errors='coerce').isna()
+    ]
+    non_year_column_list: list[str] = non_year_columns.to_list()
+    # Only rows that share the non-year values with another row can hold
+    # duplicate data points, so only those are melted to long format. Empty
+    # cells are dropped first, as they are in `pyam.IamDataFrame`.
+    duplicate_rows_mask: pd.Series = data.duplicated(
+        subset=non_year_column_list,
+        keep=False,
+    )
+    if not duplicate_rows_mask.any():
+        return
+    long_data: pd.DataFrame = data.loc[duplicate_rows_mask].melt(
+        id_vars=non_year_column_list,
+        var_name='_year',
+        value_name='_value',
+    ).dropna(subset=['_value'])
+    num_duplicates: int = int(
+        long_data.duplicated(subset=non_year_column_list + ['_year']).sum()
+    )
+    if num_duplicates > 0:
+        raise UploadFormatError(
+            f'The uploaded file has {num_duplicates} duplicate data point(s), '
+            'i.e., values for the same year in rows with the same values in '
+            'the non-year columns. Please remove the duplicates and upload the '
+            'file again.'
+        )
+###END def check_iamc_format
+
+
 def make_timeseries_table(idf: pyam.IamDataFrame) -> DataframeState:
     """Get the timeseries table of an IamDataFrame.
 
     Check the session state to see if `idf` is the same as the current uploaded
     IamDataFrame, and whether a timeseries table has already been generated.
-    If so, use that.
+    If so, use that. If not, the generated table is stored in the session
+    state, so that it is not recomputed on every rerun. It is cleared together
+    with the uploaded IamDataFrame when a new file is uploaded.
+
+    Only `TIMESERIES_TABLE_PAGE_SIZE` rows are sent to the browser at a time,
+    with a number input to select which page to show. Rendering the full
+    table makes the page unresponsive for large files.
     """
     timeseries: pd.DataFrame|None = None
-    if idf is st.session_state.get(SSKey.IAM_DF_UPLOADED):
+    is_uploaded_df: bool = idf is st.session_state.get(SSKey.IAM_DF_UPLOADED)
+    if is_uploaded_df:
         timeseries = st.session_state.get(SSKey.IAM_DF_TIMESERIES, None)
     if timeseries is None:
         timeseries = idf.timeseries()
-    return st.dataframe(timeseries)
+        if is_uploaded_df:
+            st.session_state[SSKey.IAM_DF_TIMESERIES] = timeseries
+    num_rows: int = len(timeseries)
+    num_pages: int = max(1, -(-num_rows // TIMESERIES_TABLE_PAGE_SIZE))
+    page: int = 1
+    if num_pages > 1:
+        page = st.number_input(
+            'Page',
+            min_value=1,
+            max_value=num_pages,
+            value=1,
+            step=1,
+        )
+    start: int = (page - 1) * TIMESERIES_TABLE_PAGE_SIZE
+    stop: int = min(start + TIMESERIES_TABLE_PAGE_SIZE, num_rows)
+    st.caption(f'Showing rows {start + 1 if num_rows else 0}-{stop} of '
+               f'{num_rows} (page {page} of {num_pages})')
+    return st.dataframe(timeseries.iloc[start:stop])
 ###END def get_timeseries_table
 
 
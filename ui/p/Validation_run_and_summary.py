@@ -51,11 +51,18 @@ def main():
             'run.',
             icon='ℹ️',
         )
+        reload_dsd: bool = st.checkbox(
+            'Reload name definitions before running',
+            value=False,
+            help='Reload the lists of recognized names from their source, to '
+                'pick up any updates. This takes longer than using the '
+                'definitions that are already loaded.',
+        )
         button_field = st.empty()
         if button_field.button('Run name checks'):
             button_field.empty()
             dsd: DataStructureDefinition = \
-                get_validation_dsd(force_load=True, allow_load=True,
+                get_validation_dsd(force_load=reload_dsd, allow_load=True,
                                    show_spinner=True)
             dsd_dims: list[str] = [str(_dim) for _dim in dsd.dimensions]
             non_region_dims: list[str] = [_dim for _dim in dsd_dims
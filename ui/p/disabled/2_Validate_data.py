@@ -1,21 +1,17 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
 import re
-import tempfile
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 
-from streamlit_extras.switch_page_button import switch_page
-
 from validation.data_structure import *
 from validation.vetting import *
 
 
-pd.options.mode.chained_assignment = None  # default='warn'
-
 st.set_page_config(layout="wide")
 
 
@@ -63,15 +59,12 @@ def main():
         else:
             with placeholder.container():
                 with st.spinner('Validating...'):
-                    df_styled = validated_df.style.applymap(lambda x: f'background-color: red' if 'not found' in str(x) or 'Duplicate' in str(x) or 'Vetting error' in str(x) else (f'background-color: yellow' if str(x) == 'nan' or 'Vetting warning' in str(x) or 'sum check error' in str(x) else f'background-color: white'))
-
-                    with tempfile.NamedTemporaryFile() as temp:
-                        temp_filename = os.path.join(os.getcwd(),'temp', f'{temp.name}.xlsx')
-
-                        convert_df(df_styled, temp_filename)
-                        
-                        with open(temp_filename, 'rb') as template_file:
-                            template_byte = template_file.read()
+                    # Only write the Excel file once per validation run, not on
+                    # every rerun of the page.
+                    template_byte = st.session_state.get('validated_excel_bytes')
+                    if template_byte is None:
+                        template_byte = convert_df(validated_df)
+                        st.session_state['validated_excel_bytes'] = template_byte
 
 
                     if st.session_state.get('duplicates_count'):
@@ -97,7 +90,10 @@ def main():
 
                     st.markdown('Scroll the dataframe to the right to see all errors and warnings in detail. You can also download validation results in an Excel file, \
                         fix potential errors, and re-upload them.')
-                    st.dataframe(df)
+                    # Only the check columns can hold error/warning messages,
+                    # so only those are styled.
+                    check_columns = [c for c in validated_df.columns if is_check_column(c)]
+                    st.dataframe(validated_df.style.map(highlight_check_cell, subset=check_columns))
                     st.download_button(label="Download validation results",
                         data=template_byte,
                         file_name="validated.xlsx",
@@ -108,7 +104,7 @@ def main():
                     # validate_data_btn = st.button('Go back to data upload')
                     
                     # if validate_data_btn:
-                    #     switch_page("Upload data") 
+                    #     st.switch_page("p/Upload_data.py")
 
     else: 
         with placeholder.container():
@@ -119,7 +115,7 @@ def main():
             validate_data_btn = st.button('Upload data')
             
             if validate_data_btn:
-                switch_page('Upload data') 
+                st.switch_page('p/Upload_data.py')
 
 
 def validate(df, indices_check, vetting_check, basic_sums_check):
@@ -148,15 +144,57 @@ def validate(df, indices_check, vetting_check, basic_sums_check):
             st.session_state['basic_sum_check_errors'] = df.basic_sum_check.str.count('year').sum()
 
         st.session_state['validated_data'] = df
+        st.session_state.pop('validated_excel_bytes', None)
 
 
 def count_errors(df, column):
     return (df[column] != '').sum()
 
 
-@st.cache_data
-def convert_df(_df,filename):
-    return _df.to_excel(filename,index=None)
+# Cell contents that are highlighted in the Excel output. Highlighting is done
+# with one conditional format rule per string, rather than by styling every
+# cell of the DataFrame in Python before writing.
+ERROR_HIGHLIGHT_TEXTS = ['not found', 'Duplicate', 'Vetting error']
+WARNING_HIGHLIGHT_TEXTS = ['Vetting warning', 'sum check error']
+
+
+def is_check_column(column):
+    return str(column).endswith('_check')
+
+
+def highlight_check_cell(value):
+    if not isinstance(value, str):
+        return ''
+    if any(text in value for text in ERROR_HIGHLIGHT_TEXTS):
+        return 'background-color: red'
+    if any(text in value for text in WARNING_HIGHLIGHT_TEXTS):
+        return 'background-color: yellow'
+    return ''
+
+
+def convert_df(df):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=None)
+        worksheet = writer.sheets['Sheet1']
+        error_format = writer.book.add_format({'bg_color': 'red'})
+        warning_format = writer.book.add_format({'bg_color': 'yellow'})
+        # Rules added first take precedence, so errors must come first. FIND
+        # is used rather than the 'containing' text rule (which uses SEARCH),
+        # so that matching is case-sensitive like the `in` tests above. The
+        # cell reference in the formula is relative to the top-left cell.
+        cell_range = (1, 0, len(df), len(df.columns) - 1)
+        for text in ERROR_HIGHLIGHT_TEXTS:
+            worksheet.conditional_format(*cell_range, {'type': 'formula', 'criteria': f'=ISNUMBER(FIND("{text}",A2))', 'format': error_format})
+        for text in WARNING_HIGHLIGHT_TEXTS:
+            worksheet.conditional_format(*cell_range, {'type': 'formula', 'criteria': f'=ISNUMBER(FIND("{text}",A2))', 'format': warning_format})
+        # Missing values in the data columns are highlighted as warnings.
+        # Passed checks are written as blank cells, so the check columns are
+        # left out.
+        for col_num, column in enumerate(df.columns):
+            if not is_check_column(column):
+                worksheet.conditional_format(1, col_num, len(df), col_num, {'type': 'blanks', 'format': warning_format})
+    return buffer.getvalue()
 
     
 if __name__ == "__main__":
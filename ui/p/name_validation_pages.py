@@ -16,8 +16,8 @@ from nomenclature import (
 from common_elements import (
     check_data_is_uploaded,
     common_setup,
+    get_attribute_df,
     get_validation_dsd,
-    make_attribute_df,
 )
 from common_keys import SSKey
 from page_ids import PageName
@@ -204,7 +204,7 @@ def make_name_validation_dim_page(
                     f'recognized</span> {dim_name} names:',
                     unsafe_allow_html=True,
                 )
-                attribute_df: pd.DataFrame = make_attribute_df(
+                attribute_df: pd.DataFrame = get_attribute_df(
                     getattr(dsd, dim_name),
                     attr_names=show_valid_code_attrs,
                     column_names=show_valid_code_colnames,
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import os
 import re
-pd.options.mode.chained_assignment = None  # default='warn'
 
 st.set_page_config(layout="wide")
 